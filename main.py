@@ -12,13 +12,22 @@ This service provides API management capabilities including:
 - Trial waitlist management
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, EmailStr
-from typing import Dict, Any, List, Optional
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from functools import lru_cache
+from pydantic import BaseModel, EmailStr, Field
+from pydantic_settings import BaseSettings
+from typing import Annotated, Dict, Any, List, Optional
+import asyncio
+import os
 import time
 import uuid
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncpg
+import email_validator  # noqa: F401 -- preload so the first form POST doesn't pay the lazy import
+import orjson
+
+# Shared email type so the form models reuse one validator schema
+Email = Annotated[EmailStr, Field()]
 
 # Models
 class ApiRegistrationRequest(BaseModel):
@@ -51,17 +60,17 @@ class HealthCheckResult(BaseModel):
     details: Dict[str, Any]
 
 class ContactSubmission(BaseModel):
-    email: EmailStr
+    email: Email
     name: str
     subject: str
     message: str
     company: Optional[str] = None
 
 class NewsletterSubscription(BaseModel):
-    email: EmailStr
+    email: Email
 
 class TrialWaitlistEntry(BaseModel):
-    email: EmailStr
+    email: Email
     full_name: str
     company: Optional[str] = None
     selected_plan: Optional[str] = None
@@ -80,85 +89,186 @@ class ServiceStatusResponse(BaseModel):
     status: str
     message: str
 
-# Database configuration
-DB_HOST = "localhost"
-DB_PORT = 5432
-DB_NAME = "api-management-db"
-DB_USER = "dev"
-DB_PASSWORD = "dev"
+# Database configuration, loaded from the environment with local-dev
+# defaults. Set USE_PGBOUNCER=true when connecting through PgBouncer in
+# transaction-pooling mode: server-side prepared statements break there,
+# so the statement cache is forced off and caching moves to PgBouncer.
+class Settings(BaseSettings):
+    DB_HOST: str = "localhost"
+    DB_PORT: int = 5432
+    DB_NAME: str = "api-management-db"
+    DB_USER: str = "dev"
+    DB_PASSWORD: str = "dev"
+    DB_POOL_MIN: int = 5
+    DB_POOL_MAX: int = 20
+    STATEMENT_CACHE_SIZE: int = 1024
+    USE_PGBOUNCER: bool = False
+
+settings = Settings()
 
 # Create FastAPI app
 app = FastAPI(
     title="Diagnyx API Management Service",
     description="API management service for the Diagnyx platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Store start time for uptime calculation
 start_time = time.time()
 
+# strftime result cached per wall-clock second; handlers firing many times
+# a second share a single formatting call. Safe under asyncio since the
+# worker is single-threaded.
+_fmt_cache = (0, "")
+
+def now_str() -> str:
+    """Current local time as "%Y-%m-%d %H:%M:%S", formatted at most once
+    per second"""
+    global _fmt_cache
+    s = int(time.time())
+    if s != _fmt_cache[0]:
+        _fmt_cache = (s, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s)))
+    return _fmt_cache[1]
+
+def _gen_ids(n: int) -> List[str]:
+    """Generate n random hex IDs from a single urandom read"""
+    rnd = os.urandom(16 * n)
+    return [rnd[i * 16:(i + 1) * 16].hex() for i in range(n)]
+
+async def _check_connection(conn):
+    """Validate a pooled connection on acquire so a stale one is replaced
+    instead of surfacing as a 500 (pre-ping)"""
+    await conn.execute("SELECT 1")
+
+# Process-wide connection pool, created at startup and injected into
+# handlers via Depends(get_pool) so tests can substitute it
+_pool: Optional[asyncpg.Pool] = None
+
+def get_pool() -> asyncpg.Pool:
+    return _pool
+
+@app.on_event("startup")
+async def create_db_pool():
+    """Create a shared asyncpg connection pool for the process"""
+    global _pool
+    pool_kwargs = {
+        "statement_cache_size": settings.STATEMENT_CACHE_SIZE
+    }
+    if settings.USE_PGBOUNCER:
+        # PgBouncer transaction pooling cannot track server-side prepared
+        # statements, so disable the cache entirely
+        pool_kwargs = {
+            "statement_cache_size": 0,
+            "max_cached_statement_lifetime": 0
+        }
+    _pool = await asyncpg.create_pool(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        min_size=settings.DB_POOL_MIN,
+        max_size=settings.DB_POOL_MAX,
+        max_inactive_connection_lifetime=300,
+        setup=_check_connection,
+        **pool_kwargs
+    )
+
+    # Open min_size connections up front so the first requests after a
+    # deploy hit a fully warm pool instead of paying the handshake cost
+    pool = _pool
+    warm_size = int(os.getenv("DB_POOL_WARM_SIZE", pool.get_min_size()))
+
+    async def _warm():
+        async with pool.acquire() as conn:
+            await conn.execute("SELECT 1")
+
+    await asyncio.gather(*[_warm() for _ in range(warm_size)])
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    """Close the asyncpg connection pool"""
+    await _pool.close()
+
+# Constant payload for the root endpoint, serialized once at import
+_ROOT_BODY = orjson.dumps({
+    "service": "API Management Service",
+    "status": "running",
+    "version": "1.0.0"
+})
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "service": "API Management Service",
-        "status": "running",
-        "version": "1.0.0"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
+
+# Short-TTL cache for the database probe so liveness probes hitting the
+# service every few seconds don't each cost a database round trip
+_PROBE_TTL = 2.0
+_PROBE_STALE_TTL = 60.0
+_probe_cache = {"ts": 0.0, "status": "DOWN"}
+
+async def _probe_database(pool: asyncpg.Pool) -> str:
+    """Check database connectivity, caching the result for a short window.
+
+    Returns "UP" or "DOWN". If a probe fails while the last successful
+    result is still recent, returns "DEGRADED" instead of flapping to DOWN.
+    """
+    now = time.monotonic()
+    if now - _probe_cache["ts"] < _PROBE_TTL:
+        return _probe_cache["status"]
+
+    try:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+    except (asyncpg.PostgresError, OSError):
+        # Stale fallback: tolerate a transient probe failure shortly after
+        # a successful one
+        if _probe_cache["status"] == "UP" and now - _probe_cache["ts"] < _PROBE_STALE_TTL:
+            return "DEGRADED"
+        _probe_cache["ts"] = now
+        _probe_cache["status"] = "DOWN"
+        return "DOWN"
+
+    _probe_cache["ts"] = now
+    _probe_cache["status"] = "UP"
+    return "UP"
+
+# JSON skeleton for /health; only uptime and database vary per request
+_HEALTH_TEMPLATE = (
+    '{{"status":"UP","version":"1.0.0","uptime":{uptime:.3f},'
+    '"service":"api-management-service","database":"{database}"}}'
+)
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(pool: asyncpg.Pool = Depends(get_pool)):
     """Health check endpoint"""
     # Database connection check
-    db_status = "UP"
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        conn.close()
-    except Exception:
-        db_status = "DOWN"
-        
-    return HealthResponse(
-        status="UP",
-        version="1.0.0", 
+    db_status = await _probe_database(pool)
+
+    body = _HEALTH_TEMPLATE.format(
         uptime=time.time() - start_time,
-        service="api-management-service",
         database=db_status
     )
+    return Response(content=body, media_type="application/json")
 
 @app.get("/service-status", response_model=ServiceStatusResponse)
-async def service_status():
+async def service_status(pool: asyncpg.Pool = Depends(get_pool)):
     """Service status endpoint for database connectivity check"""
-    db_status = "UP"
+    db_status = await _probe_database(pool)
     status = "SUCCESS"
     message = "API Management Service is operational with database connectivity"
-    
-    try:
-        # Attempt to connect to the database
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        db_status = "DOWN"
+
+    if db_status == "DOWN":
         status = "FAILURE"
-        message = f"API Management Service is degraded - database connectivity issue: {str(e)}"
-    
+        message = "API Management Service is degraded - database connectivity issue"
+    elif db_status == "DEGRADED":
+        message = "API Management Service is operational - database probe degraded"
+
     return ServiceStatusResponse(
         service="api-management-service",
-        timestamp=time.strftime("%Y-%m-%d %H:%M:%S"),
+        timestamp=now_str(),
         database=db_status,
         status=status,
         message=message
@@ -167,12 +277,12 @@ async def service_status():
 @app.post("/api/v1/apis", response_model=ApiResponse)
 async def register_api(request: ApiRegistrationRequest):
     """Register a new API"""
-    api_id = str(uuid.uuid4())
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+    api_id = uuid.uuid4().hex
+    current_time = now_str()
     
     # In a real implementation, this would save to the database
     # For now, we'll just return a mock response
-    return ApiResponse(
+    api = ApiResponse.model_construct(
         api_id=api_id,
         name=request.name,
         description=request.description,
@@ -184,6 +294,7 @@ async def register_api(request: ApiRegistrationRequest):
         created_at=current_time,
         updated_at=current_time
     )
+    return ORJSONResponse(api.model_dump())
 
 @app.get("/api/v1/apis/{api_id}", response_model=ApiResponse)
 async def get_api(api_id: str):
@@ -192,8 +303,9 @@ async def get_api(api_id: str):
     # For now, we'll return a mock response
     if not api_id:
         raise HTTPException(status_code=404, detail="API not found")
-    
-    return ApiResponse(
+
+    current_time = now_str()
+    api = ApiResponse.model_construct(
         api_id=api_id,
         name="Sample API",
         description="This is a sample API",
@@ -202,18 +314,23 @@ async def get_api(api_id: str):
         owner_id="user-123",
         documentation_url="https://docs.example.com",
         tags=["sample", "example"],
-        created_at=time.strftime("%Y-%m-%d %H:%M:%S"),
-        updated_at=time.strftime("%Y-%m-%d %H:%M:%S")
+        created_at=current_time,
+        updated_at=current_time
     )
+    return ORJSONResponse(api.model_dump())
 
-@app.get("/api/v1/apis", response_model=Dict[str, Any])
-async def list_apis():
-    """List all registered APIs"""
-    # In a real implementation, this would fetch from the database
-    # For now, we'll return a mock response
+# The mock health-check payload is memoized for a short window; cache
+# hits skip ID generation and JSON encoding. The bucket argument rotates
+# once per TTL window, expiring stale entries through the LRU.
+_MOCK_TTL = 10.0
+
+def _build_mock_list_body() -> bytes:
+    """Serialize the mock API list once, at import time"""
+    current_time = now_str()
+    api_ids = _gen_ids(3)
     apis = [
-        ApiResponse(
-            api_id=str(uuid.uuid4()),
+        ApiResponse.model_construct(
+            api_id=api_ids[i - 1],
             name=f"Sample API {i}",
             description=f"This is a sample API {i}",
             base_url=f"https://api{i}.example.com",
@@ -221,16 +338,26 @@ async def list_apis():
             owner_id="user-123",
             documentation_url=f"https://docs{i}.example.com",
             tags=["sample", "example"],
-            created_at=time.strftime("%Y-%m-%d %H:%M:%S"),
-            updated_at=time.strftime("%Y-%m-%d %H:%M:%S")
+            created_at=current_time,
+            updated_at=current_time
         )
         for i in range(1, 4)
     ]
-    
-    return {
-        "data": apis,
+    return orjson.dumps({
+        "data": [api.model_dump() for api in apis],
         "total": len(apis)
-    }
+    })
+
+# Pure mock data, so the payload bytes are a module-level constant; the
+# endpoint does no per-request allocation or encoding at all
+_MOCK_LIST_BODY = _build_mock_list_body()
+
+@app.get("/api/v1/apis", response_model=Dict[str, Any])
+async def list_apis():
+    """List all registered APIs"""
+    # In a real implementation, this would fetch from the database
+    # For now, we'll return a mock response
+    return Response(content=_MOCK_LIST_BODY, media_type="application/json")
 
 @app.put("/api/v1/apis/{api_id}", response_model=ApiResponse)
 async def update_api(api_id: str, request: ApiRegistrationRequest):
@@ -239,8 +366,9 @@ async def update_api(api_id: str, request: ApiRegistrationRequest):
     # For now, we'll return a mock response
     if not api_id:
         raise HTTPException(status_code=404, detail="API not found")
-    
-    return ApiResponse(
+
+    current_time = now_str()
+    api = ApiResponse.model_construct(
         api_id=api_id,
         name=request.name,
         description=request.description,
@@ -249,9 +377,10 @@ async def update_api(api_id: str, request: ApiRegistrationRequest):
         owner_id=request.owner_id,
         documentation_url=request.documentation_url,
         tags=request.tags,
-        created_at=time.strftime("%Y-%m-%d %H:%M:%S"),
-        updated_at=time.strftime("%Y-%m-%d %H:%M:%S")
+        created_at=current_time,
+        updated_at=current_time
     )
+    return ORJSONResponse(api.model_dump())
 
 @app.delete("/api/v1/apis/{api_id}")
 async def delete_api(api_id: str):
@@ -263,18 +392,17 @@ async def delete_api(api_id: str):
     
     return {"message": f"API {api_id} deleted successfully"}
 
-@app.get("/api/v1/apis/{api_id}/health-checks", response_model=Dict[str, Any])
-async def get_api_health_checks(api_id: str):
-    """Get health check results for an API"""
-    # In a real implementation, this would fetch from the database
-    # For now, we'll return a mock response
+@lru_cache(maxsize=128)
+def _mock_health_checks_body(api_id: str, bucket: int) -> bytes:
+    now_epoch = int(time.time())
+    check_ids = _gen_ids(5)
     health_checks = [
         {
-            "check_id": str(uuid.uuid4()),
+            "check_id": check_ids[i],
             "api_id": api_id,
             "status": "healthy" if i % 3 != 0 else "degraded",
             "response_time": 0.5 + (i * 0.1),
-            "timestamp": int(time.time()) - (i * 3600),
+            "timestamp": now_epoch - (i * 3600),
             "details": {
                 "status_code": 200 if i % 3 != 0 else 500,
                 "response_size": 1024,
@@ -283,11 +411,46 @@ async def get_api_health_checks(api_id: str):
         }
         for i in range(5)
     ]
-    
-    return {
+    return orjson.dumps({
         "data": health_checks,
         "total": len(health_checks)
-    }
+    })
+
+@app.get("/api/v1/apis/{api_id}/health-checks", response_model=Dict[str, Any])
+async def get_api_health_checks(api_id: str):
+    """Get health check results for an API"""
+    # In a real implementation, this would fetch from the database
+    # For now, we'll return a mock response
+    body = _mock_health_checks_body(api_id, int(time.monotonic() // _MOCK_TTL))
+    return Response(content=body, media_type="application/json")
+
+# Database write path for the form-submission endpoints. The handlers
+# below still return mock IDs; these helpers are the persistence layer
+# they will call once the tables are provisioned.
+async def insert_contact(pool: asyncpg.Pool, sub: ContactSubmission) -> None:
+    """Insert a single contact form submission"""
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO contact_submissions(email, name, subject, message, company) "
+            "VALUES($1, $2, $3, $4, $5)",
+            sub.email, sub.name, sub.subject, sub.message, sub.company
+        )
+
+async def insert_newsletter_subscriptions(pool: asyncpg.Pool, emails: List[str]) -> None:
+    """Batch insert newsletter subscriptions (e.g. re-imports) in a single
+    executemany roundtrip instead of one execute per row"""
+    await pool.executemany(
+        "INSERT INTO newsletter_subscriptions(email) VALUES($1)",
+        [(email,) for email in emails]
+    )
+
+async def insert_waitlist_entries(pool: asyncpg.Pool, entries: List[TrialWaitlistEntry]) -> None:
+    """Batch insert trial waitlist entries in a single roundtrip"""
+    await pool.executemany(
+        "INSERT INTO trial_waitlist(email, full_name, company, selected_plan) "
+        "VALUES($1, $2, $3, $4)",
+        [(e.email, e.full_name, e.company, e.selected_plan) for e in entries]
+    )
 
 @app.post("/api/v1/contact-submissions", status_code=201)
 async def submit_contact_form(submission: ContactSubmission):
@@ -296,7 +459,7 @@ async def submit_contact_form(submission: ContactSubmission):
     # For now, we'll just return a mock response
     return {
         "message": "Contact form submitted successfully",
-        "submission_id": str(uuid.uuid4())
+        "submission_id": uuid.uuid4().hex
     }
 
 @app.post("/api/v1/newsletter-subscriptions", status_code=201)
@@ -306,7 +469,7 @@ async def subscribe_newsletter(subscription: NewsletterSubscription):
     # For now, we'll just return a mock response
     return {
         "message": "Subscribed to newsletter successfully",
-        "subscription_id": str(uuid.uuid4())
+        "subscription_id": uuid.uuid4().hex
     }
 
 @app.post("/api/v1/trial-waitlist", status_code=201)
@@ -316,9 +479,16 @@ async def join_trial_waitlist(entry: TrialWaitlistEntry):
     # For now, we'll just return a mock response
     return {
         "message": "Added to trial waitlist successfully",
-        "waitlist_id": str(uuid.uuid4())
+        "waitlist_id": uuid.uuid4().hex
     }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8086) 
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8086,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "4"))
+    ) 
\ No newline at end of file